@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Archive of fields with optional solutions in one binary file.
+
+File is magic followed by records: packed field, number of moves (-1 if
+there is no solution) and packed move directions (check `serialization`).
+Reading maps the file and decodes records one by one, so the archive is
+never loaded into memory as a whole.
+"""
+
+import mmap
+import struct
+from typing import Iterable, Iterator, Optional, Sequence
+
+import serialization
+from field import Field
+from move import Move
+
+
+_MAGIC = b"SOKARC1\0"
+_TOTAL_MOVES = struct.Struct("<i")
+
+Entry = tuple[Field, Optional[Sequence[Move]]]
+
+
+def writeArchive(path: str, entries: Iterable[Entry]) -> int:
+	"""Write (field, solution moves or None) `entries` to `path`.
+	Returns number of written entries.
+	"""
+	totalEntries = 0
+	with open(path, "wb") as f:
+		f.write(_MAGIC)
+		for field, moves in entries:
+			f.write(field.toBytes())
+			if moves is None:
+				f.write(_TOTAL_MOVES.pack(-1))
+			else:
+				f.write(_TOTAL_MOVES.pack(len(moves)))
+				f.write(serialization.packDirs(move.dir_ for move in moves))
+			totalEntries += 1
+
+	return totalEntries
+
+
+def iterArchive(path: str) -> Iterator[tuple[Field, tuple[Move, ...] | None]]:
+	"""Generate (field, solution moves or None) entries written by
+	`writeArchive`.
+	"""
+	with open(path, "rb") as f:
+		mmap_ = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+	view = memoryview(mmap_)
+	try:
+		if view[:len(_MAGIC)] != _MAGIC:
+			raise ValueError(f"{path} is not an archive")
+
+		offset = len(_MAGIC)
+		while offset < len(view):
+			field = Field.fromBytes(view, offset)
+			offset += serialization.getFieldSize(view, offset)
+			totalMoves, = _TOTAL_MOVES.unpack_from(view, offset)
+			offset += _TOTAL_MOVES.size
+			moves = None
+			if totalMoves >= 0:
+				moves = field.getMovesFromDirs(serialization.unpackDirs(view, totalMoves, offset))
+				offset += serialization.getDirsSize(totalMoves)
+
+			yield field, moves
+	finally:
+		view.release()
+		mmap_.close()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Solver scaling benchmark on generated levels.
+Shell-'executable'.
+"""
+
+import time
+from typing import Iterable
+
+from generator import generateLevels
+
+
+def benchmark(
+	sizes: Iterable[tuple[int, int, int]],  # (n, m, totalBoxes) triples
+	levelsPerSize: int = 5,
+	wallDensity: float = 0.2,
+	seed: int = 0
+) -> list[tuple[int, int, int, float, int]]:
+	"""Solve `levelsPerSize` generated levels for each size and print
+	time and nodes per second.
+
+	Returns list of (n, m, totalBoxes, total seconds, total nodes) tuples.
+	"""
+	print(f"{'n':>3} {'m':>3} {'boxes':>5} {'seconds':>9} {'nodes':>10} {'nodes/s':>10}")
+	results = []
+	for n, m, totalBoxes in sizes:
+		seconds = 0.0
+		nodes = 0
+		for field in generateLevels(levelsPerSize, n, m, wallDensity, totalBoxes, seed):
+			t0 = time.perf_counter()
+			field.solve()
+			seconds += time.perf_counter() - t0
+			nodes += field.totalNodes
+
+		print(
+			f"{n:>3} {m:>3} {totalBoxes:>5} {seconds:>9.3f} {nodes:>10_}"
+			f" {nodes / seconds if seconds else 0:>10_.0f}"
+		)
+		results.append((n, m, totalBoxes, seconds, nodes))
+
+	return results
+
+
+def main():
+	benchmark([
+		(5, 5, 1),
+		(5, 5, 2),
+		(6, 6, 2),
+		(6, 6, 3),
+		(7, 7, 3),
+		(8, 8, 3),
+	])
+
+
+if __name__ == "__main__":
+	main()
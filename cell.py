@@ -72,6 +72,18 @@ class Cell:
 	def runnerOnGoal(cls) -> Self:
 		return cls(CellType.GOAL, CellState.RUNNER)
 
+	@classmethod
+	def fromChar(cls, c: str) -> Self:
+		"""Inverse of `str(cell)`."""
+		for factory in (
+			cls.empty, cls.wall, cls.goal, cls.box, cls.runner, cls.boxOnGoal, cls.runnerOnGoal
+		):
+			cell = factory()
+			if str(cell) == c:
+				return cell
+
+		raise KeyError(f"No {cls.__name__} is represented by '{c}'")
+
 	def __str__(self) -> str:
 		if self.type_ == CellType.WALL:
 			return "x"
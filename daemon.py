@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Local solver daemon.
+Shell-'executable'.
+
+Keeps a pool of warm worker processes and serves solve requests over
+localhost HTTP:
+
+	POST /solve  {"level": "<Field.toText() text>", "optimal": false}
+	GET  /stats
+
+Identical requests which are in progress at the same time are solved once,
+recent results are kept in memory (LRU). Each solve is limited in time, and
+the pool is replaced if a worker process dies.
+"""
+
+import json
+import os
+import signal
+import threading
+import urllib.request
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+from field import Field
+
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Default max seconds of solving one level.
+DEFAULT_TIME_LIMIT = 60.0
+
+
+def _warmUp() -> int:
+	"""Make sure worker process is started and solver is imported."""
+	return os.getpid()
+
+
+def _onTimeLimit(signum, frame) -> None:
+	raise TimeoutError("Time limit exceeded")
+
+
+def _solveLevel(level: str, optimal: bool, timeLimit: float | None) -> dict:
+	"""Worker task: solve level given in `Field.toText` format.
+	Raises TimeoutError after `timeLimit` seconds (if it's not None).
+	"""
+	field = Field.fromText(level)
+	if timeLimit is not None:
+		# Tasks run in the main thread of the worker, so it can use signals.
+		signal.signal(signal.SIGALRM, _onTimeLimit)
+		signal.setitimer(signal.ITIMER_REAL, timeLimit)
+	try:
+		solvable = field.solve(optimal)
+	finally:
+		if timeLimit is not None:
+			signal.setitimer(signal.ITIMER_REAL, 0)
+	return {
+		"solvable": solvable,
+		"moves": field.getWinMovesRepr(),
+		"totalNodes": field.totalNodes,
+	}
+
+
+class SolverDaemon:
+	"""Worker pool with in-flight deduplication and LRU results cache."""
+
+	__slots__ = (
+		# : ProcessPoolExecutor
+		# Replaced with a new one if it gets broken.
+		'_pool',
+		# : int
+		'_workers',
+		# : float | None
+		# Max seconds of solving one level.
+		'_timeLimit',
+		# : int
+		# Max number of cached results.
+		'_cacheSize',
+		# : OrderedDict[tuple[str, bool], dict]
+		# Request key to result relation, least recently used first.
+		'_cache',
+		# : dict[tuple[str, bool], Future]
+		# Requests which are being solved right now.
+		'_inFlight',
+		# : threading.Lock
+		# Guards `self._pool`, `self._cache` and `self._inFlight`.
+		'_lock',
+		# : dict[str, int]
+		'_stats',
+	)
+
+	def __init__(
+		self,
+		workers: Optional[int] = None,
+		cacheSize: int = 1024,
+		timeLimit: Optional[float] = DEFAULT_TIME_LIMIT
+	):
+		if not isinstance(cacheSize, int) or cacheSize < 0:
+			raise ValueError("`cacheSize` must be non-negative int")
+		if timeLimit is not None and (not isinstance(timeLimit, (int, float)) or timeLimit <= 0):
+			raise ValueError("`timeLimit` must be None or positive number")
+
+		if workers is None:
+			workers = os.cpu_count() or 1
+		self._pool = ProcessPoolExecutor(workers)
+		self._workers = workers
+		self._timeLimit = timeLimit
+		self._cacheSize = cacheSize
+		self._cache: OrderedDict[tuple[str, bool], dict] = OrderedDict()
+		self._inFlight: dict[tuple[str, bool], Future] = {}
+		self._lock = threading.Lock()
+		self._stats = {"requests": 0, "cacheHits": 0, "deduplicated": 0, "solved": 0}
+
+		# Start all workers now, not on the first requests.
+		for future in [self._pool.submit(_warmUp) for _ in range(workers)]:
+			future.result()
+
+	@property
+	def stats(self) -> dict[str, int]:
+		with self._lock:
+			return dict(self._stats, cached=len(self._cache), inFlight=len(self._inFlight))
+
+	def _onDone(self, key: tuple[str, bool], pool: ProcessPoolExecutor, future: Future) -> None:
+		with self._lock:
+			del self._inFlight[key]
+			if isinstance(future.exception(), BrokenProcessPool) and self._pool is pool:
+				# Some worker died: the pool can't run anything anymore.
+				self._pool = ProcessPoolExecutor(self._workers)
+			if future.exception() is None and self._cacheSize:
+				self._cache[key] = future.result()
+				if len(self._cache) > self._cacheSize:
+					self._cache.popitem(last=False)
+
+	def solve(self, level: str, optimal: bool = False) -> dict:
+		"""Solve level given in `Field.toText` format (blocking).
+
+		Returns dict with "solvable", "moves" and "totalNodes" keys.
+
+		Raises TypeError or ValueError for invalid args, TimeoutError if
+		solving takes longer than the time limit and RuntimeError if the
+		worker failed.
+		"""
+		if not isinstance(level, str):
+			raise TypeError("`level` must be str")
+		if not isinstance(optimal, bool):
+			raise TypeError("`optimal` must be bool")
+
+		# Normalize level text, so that equal levels share cache entries.
+		# Also raises for invalid levels before bothering workers.
+		try:
+			key = (Field.fromText(level).toText(), optimal)
+		except KeyError as e:
+			raise ValueError(f"Invalid level: {e}") from e
+
+		with self._lock:
+			self._stats["requests"] += 1
+			if key in self._cache:
+				self._stats["cacheHits"] += 1
+				self._cache.move_to_end(key)
+				return self._cache[key]
+
+			future = self._inFlight.get(key)
+			submitted = future is None
+			if submitted:
+				self._stats["solved"] += 1
+				pool = self._pool
+				try:
+					future = pool.submit(_solveLevel, *key, self._timeLimit)
+				except BrokenProcessPool:
+					pool = self._pool = ProcessPoolExecutor(self._workers)
+					future = pool.submit(_solveLevel, *key, self._timeLimit)
+				self._inFlight[key] = future
+			else:
+				self._stats["deduplicated"] += 1
+
+		# Outside of the lock: callback is called right away if the future is
+		# already done, and `self._onDone` takes the lock itself.
+		if submitted:
+			future.add_done_callback(lambda f: self._onDone(key, pool, f))
+
+		try:
+			return future.result()
+		except TimeoutError:
+			raise
+		except Exception as e:
+			raise RuntimeError(f"Worker failed: {type(e).__name__}: {e}") from e
+
+	def close(self) -> None:
+		self._pool.shutdown(cancel_futures=True)
+
+	def serve(self, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT) -> None:
+		"""Serve HTTP requests until interrupted."""
+		daemon = self
+
+		class Handler(BaseHTTPRequestHandler):
+			def _reply(self, code: int, data: dict) -> None:
+				body = json.dumps(data).encode()
+				self.send_response(code)
+				self.send_header("Content-Type", "application/json")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+
+			def do_GET(self):
+				if self.path == "/stats":
+					self._reply(200, daemon.stats)
+				else:
+					self._reply(404, {"error": "Not found"})
+
+			def do_POST(self):
+				if self.path != "/solve":
+					self._reply(404, {"error": "Not found"})
+					return
+
+				try:
+					request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+					result = daemon.solve(request["level"], request.get("optimal", False))
+				except (ValueError, KeyError, TypeError) as e:
+					self._reply(400, {"error": f"{type(e).__name__}: {e}"})
+				except TimeoutError as e:
+					self._reply(504, {"error": f"{type(e).__name__}: {e}"})
+				except Exception as e:
+					# Worker failed: RecursionError, BrokenProcessPool, ...
+					self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+				else:
+					self._reply(200, result)
+
+			def log_message(self, format, *args):
+				# Don't spam console with each request.
+				pass
+
+		with ThreadingHTTPServer((host, port), Handler) as server:
+			print(f"Serving on http://{host}:{port}")
+			try:
+				server.serve_forever()
+			except KeyboardInterrupt:
+				pass
+
+
+def requestSolve(
+	level: str,
+	optimal: bool = False,
+	host: str = DEFAULT_HOST,
+	port: int = DEFAULT_PORT
+) -> dict:
+	"""Client side of `SolverDaemon.serve`."""
+	request = urllib.request.Request(
+		f"http://{host}:{port}/solve",
+		data=json.dumps({"level": level, "optimal": optimal}).encode(),
+		headers={"Content-Type": "application/json"},
+	)
+	with urllib.request.urlopen(request) as response:
+		return json.loads(response.read())
+
+
+def main():
+	daemon = SolverDaemon()
+	try:
+		daemon.serve()
+	finally:
+		daemon.close()
+
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Distance tables over dense cell indices (check `Field.__slots__`),
+ignoring boxes.
+
+If NumPy is installed, BFS from all sources runs at once: each layer is one
+boolean matrix operation per direction, and tables are NumPy arrays.
+Otherwise, it falls back to plain BFS from each source and lists of lists.
+"""
+
+from typing import Sequence
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+from move import MoveDir
+
+
+# Distance to unreachable cells.
+UNREACHABLE = -1
+
+# Check `Field.__slots__`.
+Neighbours = dict[MoveDir, tuple[int | None, ...]]
+# Sources x cells: `np.ndarray` or list of lists.
+Matrix = Sequence[Sequence[int]]
+
+# Edges of one direction: (from cells, to cells). To cells are all different.
+_Edges = tuple[list[int], list[int]]
+
+
+def _bfs(sources: Sequence[int], size: int, edges: list[_Edges]) -> Matrix:
+	"""Get distances from each of `sources` to all `size` cells."""
+	if np is not None:
+		frontier = np.zeros((len(sources), size), dtype=bool)
+		frontier[np.arange(len(sources)), np.asarray(sources, dtype=np.intp)] = True
+		visited = frontier.copy()
+		distances = np.full((len(sources), size), UNREACHABLE, dtype=np.int32)
+		distances[frontier] = 0
+		npEdges = [
+			(np.asarray(fromCells, dtype=np.intp), np.asarray(toCells, dtype=np.intp))
+			for fromCells, toCells in edges
+		]
+		step = 0
+		while frontier.any():
+			step += 1
+			layer = np.zeros_like(frontier)
+			for fromCells, toCells in npEdges:
+				# `toCells` are all different, so nothing is overwritten.
+				layer[:, toCells] |= frontier[:, fromCells]
+			layer &= ~visited
+			distances[layer] = step
+			visited |= layer
+			frontier = layer
+
+		return distances
+
+	adjacency: list[list[int]] = [[] for _ in range(size)]
+	for fromCells, toCells in edges:
+		for fromCell, toCell in zip(fromCells, toCells):
+			adjacency[fromCell].append(toCell)
+
+	distances = []
+	for source in sources:
+		row = [UNREACHABLE] * size
+		row[source] = 0
+		layer = [source]
+		step = 0
+		while layer:
+			step += 1
+			nextLayer = []
+			for fromCell in layer:
+				for toCell in adjacency[fromCell]:
+					if row[toCell] == UNREACHABLE:
+						row[toCell] = step
+						nextLayer.append(toCell)
+			layer = nextLayer
+
+		distances.append(row)
+
+	return distances
+
+
+def getPushDistances(neighbours: Neighbours, goals: Sequence[int]) -> Matrix:
+	"""Get min number of pushes needed to bring a box from each cell
+	to each of `goals` (goals x cells).
+	"""
+	size = len(neighbours[MoveDir.RIGHT])
+	# Search backwards: pull box from the goal.
+	edges = []
+	for moveDir in MoveDir:
+		opposite = neighbours[MoveDir.getOpposite(moveDir)]
+		fromCells = []
+		toCells = []
+		for i in range(size):
+			# Box can be pushed from `prevCellIndex` to `i` in `moveDir`
+			# if there is space for the runner behind it.
+			prevCellIndex = opposite[i]
+			if prevCellIndex is not None and opposite[prevCellIndex] is not None:
+				fromCells.append(i)
+				toCells.append(prevCellIndex)
+		edges.append((fromCells, toCells))
+
+	return _bfs(goals, size, edges)
+
+
+def getWalkDistances(neighbours: Neighbours) -> Matrix:
+	"""Get min number of runner moves between each pair of cells."""
+	size = len(neighbours[MoveDir.RIGHT])
+	edges = []
+	for moveDir in MoveDir:
+		fromCells = [i for i in range(size) if neighbours[moveDir][i] is not None]
+		edges.append((fromCells, [neighbours[moveDir][i] for i in fromCells]))
+
+	return _bfs(range(size), size, edges)
+
+
+def getUnreachableCells(distances: Matrix, size: int) -> frozenset[int]:
+	"""Get cells unreachable from all sources of `distances`."""
+	if np is not None and isinstance(distances, np.ndarray):
+		return frozenset(np.flatnonzero((distances == UNREACHABLE).all(axis=0)).tolist())
+
+	return frozenset(
+		i for i in range(size)
+		if all(row[i] == UNREACHABLE for row in distances)
+	)
+
+
+def expand(distances: Matrix, rows: Sequence[int] | None, columns: Sequence[int], size: int) -> Matrix:
+	"""Translate `distances` from dense to field cell indices.
+
+	`rows` and `columns` map dense indices to field cell indices, `size` is
+	the total number of field cells. Rows are left as is if `rows` is None.
+	Missing cells get `UNREACHABLE`.
+	"""
+	if np is not None and isinstance(distances, np.ndarray):
+		totalRows = len(distances) if rows is None else size
+		result = np.full((totalRows, size), UNREACHABLE, dtype=distances.dtype)
+		rowIndices = np.arange(len(distances)) if rows is None else np.asarray(rows, dtype=np.intp)
+		result[np.ix_(rowIndices, np.asarray(columns, dtype=np.intp))] = distances
+		return result
+
+	emptyRow = [UNREACHABLE] * size
+	expandedRows = []
+	for row in distances:
+		expandedRow = emptyRow.copy()
+		for i, distance in zip(columns, row):
+			expandedRow[i] = distance
+		expandedRows.append(expandedRow)
+
+	if rows is None:
+		return expandedRows
+
+	result = [emptyRow.copy() for _ in range(size)]
+	for i, row in zip(rows, expandedRows):
+		result[i] = row
+	return result
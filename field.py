@@ -1,11 +1,17 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
 import os
 import time
-from typing import Iterable, Optional, Sequence, Callable
+from typing import Iterable, Optional, Sequence, Callable, Self
 
+import distances
+import serialization
 from cell import CellType, CellState, Cell
+from layout import InteriorAnalysis, LayoutAnalysis, LayoutCache
 from move import MoveType, MoveDir, Move
+from patterndb import PatternDatabase
+from profiler import Profiler
 
 
 class Field:
@@ -27,12 +33,44 @@ class Field:
 		# : int
 		# Number of field rows.
 		'_m',
+		# : tuple[int, ...]
+		# Interior: indices of cells reachable by the runner (and thus by
+		# boxes) if boxes are ignored, in `self._cells` order. Solver works
+		# with interior cells only and uses their positions in this tuple
+		# ('dense' indices) instead of `self._cells` indices.
+		'_interior',
+		# : dict[int, int]
+		# `self._cells` index to dense index relation for interior cells.
+		'_denseIndex',
+		# : dict[MoveDir, tuple[int | None, ...]]
+		# Dense index of the neighbour of each interior cell in each direction.
+		# None for WALLs and edges of the field.
+		'_neighbours',
+		# : frozenset[int]
+		# Dense indices of cells to which it makes no sense to move the box:
+		# `InteriorAnalysis.deadCells` if every box has to end up on a GOAL,
+		# otherwise `InteriorAnalysis.cornerCells`.
+		'_deadCells',
+		# : InteriorAnalysis
+		# Shared static analysis of the interior, the source of the values
+		# above. Keeps distance tables (check `self.getPushDistances`).
+		'_analysis',
+		# : tuple[int, ...]
+		# Boxes outside the interior: they can never be moved.
+		'_outerBoxes',
 		# : int
-		# Total number of cells which have to be covered with boxes.
+		# Part of `self.getFingerprint` for cells outside the interior,
+		# which never change.
+		'_outerFingerprint',
+		# : int
+		# Total number of interior cells which have to be covered with boxes.
 		'_totalGoals',
 		# : int
-		# Total number of boxes on the field.
+		# Total number of boxes in the interior.
 		'_totalBoxes',
+		# : tuple[PatternDatabase, ...]
+		# Used by `self.isDead`. Check `self.loadPatternDatabases`.
+		'_patternDatabases',
 
 		# CALCULATED VALUES
 
@@ -43,16 +81,50 @@ class Field:
 		# : bool | None
 		# Is None before `self._solve` was called.
 		'_solvable',
+		# : int | None
+		# Number of search-nodes checked in the last call of the `self._solve`.
+		# Is None before `self._solve` was called.
+		'_totalNodes',
+		# : tuple[Cell]
+		# Interior cells by dense indices: same objects as in `self._cells`.
+		'_interiorCells',
 		# : int
-		# Position of the runner in `self._cells`.
+		# Dense index of the runner position.
 		# Mutated by `self._solve`, but restores its value in the end.
 		'_runnerPos',
 		# : int
 		# Number of cells that have to be covered with boxes but aren't ATM.
 		# Mutated by `self._solve`, but restores its value in the end.
 		'_unachievedGoals',
+		# : set[int] | None
+		# Boxes that are allowed to be pushed in the current position:
+		# fence of PI-corral (check `self._analyseCorrals`). None means any.
+		# Mutated by `self._solve`, but restores its value in the end.
+		'_pushableBoxes',
+
+		# SOLVER OPTIONS
+		# Set by `self.solve` for the time of solving.
+
+		# : dict[MoveDir | None, MoveDir | None]
+		# Order in which runner moves are tried: maps each direction to the
+		# next one (None to the first one, the last one to None).
+		'_nextDirs',
+		# : int | None
+		# Max recursion depth of `self._boxIsDead`: boxes blocked by other
+		# boxes further than that are considered alive. None means unlimited.
+		'_deadlockDepth',
 	)
 
+	# Static analysis of layouts shared by all fields. Replace it with
+	# `LayoutCache(directory=...)` to keep analysis between runs.
+	layoutCache = LayoutCache()
+
+	# Default directory for `self.loadPatternDatabases`.
+	PATTERN_DB_DIR = ".patterndb"
+
+	# Default order of runner moves.
+	DEFAULT_DIR_ORDER = (MoveDir.RIGHT, MoveDir.UP, MoveDir.LEFT, MoveDir.DOWN)
+
 	def __init__(
 		self,
 		n: int,  # number of field columns
@@ -70,29 +142,204 @@ class Field:
 		self._cells = cells
 		self._n = n
 		self._m = len(cells) // n
-		self._totalGoals = 0
 		self._unachievedGoals = 0
-		self._totalBoxes = 0
-		hasRunner = False
+		runnerPos = None
 		for i, cell in enumerate(cells):
 			if cell.state == CellState.RUNNER:
-				if hasRunner:
+				if runnerPos is not None:
 					raise ValueError("Field must have exactly one runner")
-				hasRunner = True
-				self._runnerPos = i
-			elif cell.state == CellState.BOX:
-				self._totalBoxes += 1
+				runnerPos = i
 
-			if cell.type_ == CellType.GOAL:
-				self._totalGoals += 1
-				if cell.state != CellState.BOX:
-					self._unachievedGoals += 1
+			if cell.type_ == CellType.GOAL and cell.state != CellState.BOX:
+				self._unachievedGoals += 1
 
-		if not hasRunner:
+		if runnerPos is None:
 			raise ValueError("Field must have runner")
 
+		self._initInterior(runnerPos)
+
+		self._patternDatabases = ()
+		self._pushableBoxes = None
 		self._winMoves = None
 		self._solvable = None
+		self._totalNodes = None
+		self._nextDirs = self._getNextDirs(self.DEFAULT_DIR_ORDER)
+		self._deadlockDepth = None
+
+	def _initInterior(self, runnerPos: int) -> None:
+		"""Set interior related values: check `__slots__` for details."""
+		analysis = self.layoutCache.get(self.getLayoutKey(), self._analyseLayout).getInterior(runnerPos)
+		self._interior = analysis.interior
+		self._denseIndex = analysis.denseIndex
+		self._neighbours = analysis.neighbours
+		self._analysis = analysis
+		self._outerBoxes = tuple(
+			i for i, cell in enumerate(self._cells)
+			if cell.state == CellState.BOX and i not in self._denseIndex
+		)
+		self._outerFingerprint = hash((self.n, *(
+			0 if i in self._denseIndex else cell.getFingerprint()
+			for i, cell in enumerate(self._cells)
+		)))
+		self._setCells(self._cells)
+		self._runnerPos = self._denseIndex[runnerPos]
+		self._totalGoals = sum(cell.type_ == CellType.GOAL for cell in self._interiorCells)
+		self._totalBoxes = sum(cell.state == CellState.BOX for cell in self._interiorCells)
+		# Spare boxes may have to be parked anywhere they can be pushed to.
+		self._deadCells = (
+			analysis.deadCells if self._totalBoxes == self._totalGoals else analysis.cornerCells
+		)
+
+	def _analyseLayout(self) -> LayoutAnalysis:
+		"""Calculate static facts about all connected areas of non-WALL cells.
+		Only dimensions, WALLs and GOALs are used.
+		"""
+		componentOf: dict[int, int] = {}
+		interiors: list[InteriorAnalysis] = []
+		for start, cell in enumerate(self._cells):
+			if cell.type_ == CellType.WALL or start in componentOf:
+				continue
+
+			componentOf[start] = len(interiors)
+			interior = [start]
+			for i in interior:
+				for moveDir in MoveDir:
+					targetCellIndex = self.getTargetCellIndex(i, moveDir)
+					if (
+						targetCellIndex is not None
+						and targetCellIndex not in componentOf
+						and self._cells[targetCellIndex].type_ != CellType.WALL
+					):
+						componentOf[targetCellIndex] = len(interiors)
+						interior.append(targetCellIndex)
+
+			interior.sort()
+			denseIndex = {i: denseIndex for denseIndex, i in enumerate(interior)}
+			neighbours = {
+				moveDir: tuple(
+					denseIndex.get(self.getTargetCellIndex(i, moveDir))
+					for i in interior
+				)
+				for moveDir in MoveDir
+			}
+			goals = tuple(
+				j for j, i in enumerate(interior) if self._cells[i].type_ == CellType.GOAL
+			)
+			pushDistances = distances.getPushDistances(neighbours, goals)
+			interiors.append(InteriorAnalysis(
+				tuple(interior),
+				denseIndex,
+				neighbours,
+				self._getDeadCells(interior, pushDistances),
+				self._getCornerCells(interior, neighbours),
+				goals,
+				pushDistances
+			))
+
+		return LayoutAnalysis(componentOf, tuple(interiors))
+
+	def _setCells(self, cells: tuple[Cell]) -> None:
+		self._cells = cells
+		self._interiorCells = tuple(cells[i] for i in self._interior)
+
+	@classmethod
+	def fromText(cls, text: str) -> Self:
+		"""Inverse of `self.toText`. Short rows are padded with empty cells."""
+		rows = text.splitlines()
+		n = max((len(row) for row in rows), default=0)
+
+		return cls(n, (
+			Cell.fromChar(row[x]) if x < len(row) else Cell.empty()
+			for row in rows
+			for x in range(n)
+		))
+
+	def toText(self) -> str:
+		"""Get text representation of the field: one row per line, one
+		symbol per cell (same as in `self.show`), without borders.
+		"""
+		n = self.n
+		return "\n".join(
+			"".join(self._cellStrGen(self._cells, start=y*n, end=(y+1)*n))
+			for y in range(self.m)
+		)
+
+	@classmethod
+	def fromRle(cls, text: str) -> Self:
+		"""Inverse of `self.toRle`."""
+		return cls.fromText(
+			"\n".join(serialization.rleDecode(text).split(serialization.ROW_SEPARATOR))
+		)
+
+	def toRle(self) -> str:
+		"""Get one-line run-length encoded `self.toText`.
+		Check `serialization` for details.
+		"""
+		return serialization.rleEncode(
+			self.toText().replace("\n", serialization.ROW_SEPARATOR)
+		)
+
+	@classmethod
+	def fromBytes(cls, buffer: serialization.Buffer, offset: int = 0) -> Self:
+		"""Inverse of `self.toBytes`: read field that starts at `offset`
+		of `buffer`.
+		"""
+		n, m, runnerPos, walls, goals, boxes = serialization.unpackField(buffer, offset)
+		cells = [Cell.empty() for _ in range(n * m)]
+		for i in walls:
+			cells[i] = Cell.wall()
+		for i in goals:
+			cells[i].type_ = CellType.GOAL
+		for i in boxes:
+			cells[i].state = CellState.BOX
+		cells[runnerPos].state = CellState.RUNNER
+
+		return cls(n, cells)
+
+	def toBytes(self) -> bytes:
+		"""Get binary representation of the field: bitmasks of WALLs, GOALs
+		and boxes. Check `serialization` for details.
+		"""
+		return serialization.packField(
+			self.n,
+			self.m,
+			self._interior[self._runnerPos],
+			(i for i, cell in enumerate(self._cells) if cell.type_ == CellType.WALL),
+			(i for i, cell in enumerate(self._cells) if cell.type_ == CellType.GOAL),
+			(i for i, cell in enumerate(self._cells) if cell.state == CellState.BOX)
+		)
+
+	def getMovesFromDirs(self, dirs: Iterable[MoveDir]) -> tuple[Move, ...]:
+		"""Restore moves from their directions by replaying them from the
+		current position: a move is a push if there is a box in front of the
+		runner. Inverse of `tuple(move.dir_ for move in moves)`.
+		"""
+		runnerPos = self._interior[self._runnerPos]
+		boxes = {i for i, cell in enumerate(self._cells) if cell.state == CellState.BOX}
+		moves = []
+		for moveDir in dirs:
+			targetCellIndex = self.getTargetCellIndex(runnerPos, moveDir)
+			if targetCellIndex is None or self._cells[targetCellIndex].type_ == CellType.WALL:
+				raise ValueError(f"Move {len(moves)} goes into {CellType.WALL.name}")
+
+			moveType = MoveType.REGULAR
+			if targetCellIndex in boxes:
+				followCellIndex = self.getTargetCellIndex(targetCellIndex, moveDir)
+				if (
+					followCellIndex is None
+					or followCellIndex in boxes
+					or self._cells[followCellIndex].type_ == CellType.WALL
+				):
+					raise ValueError(f"Move {len(moves)} pushes box that can't be moved")
+
+				boxes.remove(targetCellIndex)
+				boxes.add(followCellIndex)
+				moveType = MoveType.PUSH
+
+			moves.append(Move(moveType, moveDir))
+			runnerPos = targetCellIndex
+
+		return tuple(moves)
 
 	@property
 	def n(self) -> int:
@@ -108,16 +355,118 @@ class Field:
 			self.solve()
 		return self._solvable
 
+	@property
+	def totalNodes(self) -> int | None:
+		return self._totalNodes
+
 	def getFingerprint(self) -> int:
 		"""Kinda like hash of the field."""
-		totalCells = len(self._cells)
-
 		# n and all cells fully describe field.
-		return hash(tuple(
-			self._cells[i].getFingerprint() if i < totalCells else self.n
-			for i in range(totalCells + 1)
+		return hash((
+			self._outerFingerprint,
+			*(cell.getFingerprint() for cell in self._interiorCells)
 		))
 
+	def getLayoutKey(self) -> str:
+		"""Hash of static part of the field: n, WALLs and GOALs.
+		Unlike `self.getFingerprint`, it's the same between runs.
+		"""
+		layout = f"{self.n}:" + "".join(
+			"x" if cell.type_ == CellType.WALL else "!" if cell.type_ == CellType.GOAL else " "
+			for cell in self._cells
+		)
+		return hashlib.sha1(layout.encode()).hexdigest()
+
+	def loadPatternDatabases(
+		self,
+		groupSize: int = 3,
+		directory: Optional[str] = PATTERN_DB_DIR
+	) -> tuple[PatternDatabase, ...]:
+		"""Split interior goals into groups of up to `groupSize` nearby goals,
+		load (or build and save) pattern database for each group from
+		`directory` and use them for dead positions detection.
+
+		Pass `directory=None` to build databases in memory only.
+		Previously loaded databases are closed.
+		"""
+		if not isinstance(groupSize, int) or groupSize <= 0:
+			raise ValueError("`groupSize` must be positive int")
+
+		n = self.n
+		interior = self._interior
+		goals = list(self._analysis.goals)
+		# The same layout may have several interiors: tell them by first cell.
+		interiorKey = f"{self.getLayoutKey()}_{interior[0]}"
+		databases = []
+		while goals:
+			# Group the first remaining goal with the closest ones.
+			y0, x0 = divmod(interior[goals[0]], n)
+			group = sorted(
+				goals,
+				key=lambda i: abs(interior[i] // n - y0) + abs(interior[i] % n - x0)
+			)[:groupSize]
+			goals = [i for i in goals if i not in group]
+			databases.append(PatternDatabase.forLayout(
+				self._neighbours, group, interiorKey, directory
+			))
+
+		for database in self._patternDatabases:
+			database.close()
+		self._patternDatabases = tuple(databases)
+		return self._patternDatabases
+
+	def getPushDistances(self) -> tuple[tuple[int, ...], distances.Matrix]:
+		"""Get GOALs of the interior (cell indices) and min number of pushes
+		needed to bring a box from each cell to each of them, ignoring other
+		boxes: `matrix[goal number][cell index]`, `distances.UNREACHABLE` if
+		impossible.
+
+		Tables are calculated once per layout and shared between fields.
+		"""
+		analysis = self._analysis
+		return (
+			tuple(self._interior[i] for i in analysis.goals),
+			distances.expand(analysis.pushDistances, None, self._interior, len(self._cells))
+		)
+
+	def getWalkDistances(self) -> distances.Matrix:
+		"""Get min number of runner moves between each pair of cells
+		ignoring boxes: `matrix[from cell index][to cell index]`,
+		`distances.UNREACHABLE` if impossible.
+
+		Tables are calculated once per layout and shared between fields.
+		"""
+		analysis = self._analysis
+		if analysis.walkDistances is None:
+			analysis.walkDistances = distances.getWalkDistances(self._neighbours)
+		return distances.expand(analysis.walkDistances, self._interior, self._interior, len(self._cells))
+
+	def getPushesLowerBound(self) -> int | None:
+		"""Get lower bound of pushes needed to solve the field from current
+		position according to push distances (if every box has to end up on
+		a GOAL) and pattern databases. None if it's unsolvable according
+		to them.
+		"""
+		bound = 0
+		if self._totalBoxes == self._totalGoals:
+			pushDistances = self._analysis.pushDistances
+			for i, cell in enumerate(self._interiorCells):
+				if cell.state != CellState.BOX:
+					continue
+				reachable = [row[i] for row in pushDistances if row[i] != distances.UNREACHABLE]
+				if not reachable:
+					return None
+				bound += min(reachable)
+
+		boxes = [i for i, cell in enumerate(self._interiorCells) if cell.state == CellState.BOX]
+		for database in self._patternDatabases:
+			cost = database.getLowerBound(boxes)
+			if cost is None:
+				return None
+			bound = max(bound, cost)
+
+		return bound
+
 	@staticmethod
 	def _cellStrGen(cells: Sequence[Cell], start: int, end: int) -> Iterable[str]:
 		"""Generate string representations for cells from `start` to `end`."""
@@ -172,7 +521,7 @@ class Field:
 	) -> None:
 		"""`self.show` with precalculating dead boxes."""
 		deadBoxes: set[int] = set()
-		for i, cell in enumerate(self._cells):
+		for i, cell in enumerate(self._interiorCells):
 			if (
 				cell.state == CellState.BOX
 				and i not in deadBoxes
@@ -180,7 +529,7 @@ class Field:
 			):
 				deadBoxes.add(i)
 
-		self.show(tab, sep, end, deadBoxes)
+		self.show(tab, sep, end, {*self._outerBoxes, *(self._interior[i] for i in deadBoxes)})
 
 	@staticmethod
 	def _getMovesRepr(moves: Iterable[Move] | None) -> str | None:
@@ -215,20 +564,22 @@ class Field:
 
 	def _undoMove(self, move: Move, deadBoxes: set[int]) -> set[int]:
 		"""Reverse the move and return set of dead boxes after that."""
-		prevCellIndex = self.getTargetCellIndex(self._runnerPos, MoveDir.getOpposite(move.dir_))
-		self._cells[prevCellIndex].state = CellState.RUNNER
+		cells = self._interiorCells
+		prevCellIndex = self._neighbours[MoveDir.getOpposite(move.dir_)][self._runnerPos]
+		cells[prevCellIndex].state = CellState.RUNNER
 
 		if move.type_ == MoveType.PUSH:
 			# Restore box position as well.
-			followCellIndex = self.getTargetCellIndex(self._runnerPos, move.dir_)
-			self._cells[followCellIndex].state = CellState.EMPTY
-			self._cells[self._runnerPos].state = CellState.BOX
-			if self._cells[self._runnerPos].type_ == CellType.GOAL:
+			followCellIndex = self._neighbours[move.dir_][self._runnerPos]
+			cells[followCellIndex].state = CellState.EMPTY
+			cells[self._runnerPos].state = CellState.BOX
+			if cells[self._runnerPos].type_ == CellType.GOAL:
 				self._unachievedGoals -= 1
-			if self._cells[followCellIndex].type_ == CellType.GOAL:
+			if cells[followCellIndex].type_ == CellType.GOAL:
 				self._unachievedGoals += 1
+			self._pushableBoxes = move.savedPushableBoxes
 		else:
-			self._cells[self._runnerPos].state = CellState.EMPTY
+			cells[self._runnerPos].state = CellState.EMPTY
 
 		self._runnerPos = prevCellIndex
 
@@ -247,8 +598,9 @@ class Field:
 
 	def _boxIsDead(
 		self,
-		i: int,  # cell index
-		deadBoxes: set[int]
+		i: int,  # dense cell index
+		deadBoxes: set[int],
+		depth: int = 0  # recursion depth
 	) -> bool:
 		"""Box is dead if it can't be moved in the future."""
 		# It shouldn't be called under this conditions
@@ -257,10 +609,10 @@ class Field:
 		deadNeighbours: set[MoveDir] = set()
 		questionBoxes: dict[int, MoveDir] = {}
 		for moveDir in MoveDir:
-			targetCellIndex = self.getTargetCellIndex(i, moveDir)
-			if targetCellIndex is None or self._cells[targetCellIndex].type_ == CellType.WALL:
+			targetCellIndex = self._neighbours[moveDir][i]
+			if targetCellIndex is None:
 				deadNeighbours.add(moveDir)
-			elif self._cells[targetCellIndex].state == CellState.BOX:
+			elif self._interiorCells[targetCellIndex].state == CellState.BOX:
 				if targetCellIndex in deadBoxes:
 					deadNeighbours.add(moveDir)
 				else:
@@ -269,14 +621,18 @@ class Field:
 		if self._cellIsBlocked(deadNeighbours):
 			return True
 
-		if len(deadNeighbours) + len(questionBoxes) < 2:
+		if (
+			len(deadNeighbours) + len(questionBoxes) < 2
+			or self._deadlockDepth is not None
+			and depth >= self._deadlockDepth
+		):
 			return False
 
 		deadBoxesCopy = deadBoxes.copy()
 		# For now, consider input box as dead
 		deadBoxesCopy.add(i)
 		for cnt, (targetCellIndex, moveDir) in enumerate(questionBoxes.items()):
-			if self._boxIsDead(targetCellIndex, deadBoxesCopy):
+			if self._boxIsDead(targetCellIndex, deadBoxesCopy, depth + 1):
 				deadNeighbours.add(moveDir)
 				if self._cellIsBlocked(deadNeighbours):
 					return True
@@ -290,14 +646,27 @@ class Field:
 		"""Check if field is unsolvable from current position.
 		Updates `deadBoxes` if it was passed into this method.
 		"""
-		if deadBoxes is None:
-			deadBoxes: set[int] = set()
+		denseDeadBoxes: set[int] = set() if deadBoxes is None else {
+			self._denseIndex[i] for i in deadBoxes if i in self._denseIndex
+		}
+		isDead = self._isDead(denseDeadBoxes)
+		if deadBoxes is not None:
+			deadBoxes.update(self._interior[i] for i in denseDeadBoxes)
 
+		return isDead
+
+	def _isDead(self, deadBoxes: set[int]) -> bool:
+		"""`self.isDead` for dense indices of `deadBoxes`."""
 		if self._totalBoxes - len(deadBoxes) < self._unachievedGoals:
 			return True
 
-		for i, cell in enumerate(self._cells):
-			if cell.state != CellState.BOX or i in deadBoxes:
+		boxes: list[int] = []
+		for i, cell in enumerate(self._interiorCells):
+			if cell.state != CellState.BOX:
+				continue
+
+			boxes.append(i)
+			if i in deadBoxes:
 				continue
 
 			if self._boxIsDead(i, deadBoxes):
@@ -305,12 +674,26 @@ class Field:
 				if self._totalBoxes - len(deadBoxes) < self._unachievedGoals:
 					return True
 
-		return False
+		return any(database.isDeadFor(boxes) for database in self._patternDatabases)
+
+	@staticmethod
+	def checkSolveOptions(
+		dirOrder: Optional[Sequence[MoveDir]] = None,
+		deadlockDepth: Optional[int] = None
+	) -> None:
+		"""Raise ValueError if `self.solve` args are invalid."""
+		if dirOrder is not None and sorted(dirOrder, key=lambda dir_: dir_.value) != list(MoveDir):
+			raise ValueError(f"`dirOrder` must contain each {MoveDir.__name__} exactly once")
+		if deadlockDepth is not None and (not isinstance(deadlockDepth, int) or deadlockDepth < 0):
+			raise ValueError("`deadlockDepth` must be None or non-negative int")
 
 	def solve(
 		self,
 		optimal: Optional[bool] = False,
-		logInterval: Optional[int] = None
+		logInterval: Optional[int] = None,
+		profiler: Optional[Profiler] = None,
+		dirOrder: Optional[Sequence[MoveDir]] = None,
+		deadlockDepth: Optional[int] = None
 	) -> bool:
 		"""Solve the puzzle and save the answer:
 		win moves and if it's solvable.
@@ -322,47 +705,210 @@ class Field:
 		If `logInterval` is not None - shows currently checked moves list
 		every `logInterval` 'search-nodes'. If additionally `optimal` is True -
 		shows each found solution which is better than previous one.
+
+		If `profiler` is not None - measures solver phases with it.
+
+		`dirOrder` is the order in which runner moves are tried
+		(`self.DEFAULT_DIR_ORDER` if None). It affects which solution is found
+		first and how fast.
+
+		`deadlockDepth` limits how deep dead boxes detection follows chains of
+		boxes blocking each other (unlimited if None). Lower values make each
+		check cheaper but prune less.
 		"""
-		if self._totalGoals > self._totalBoxes:
-			# Theoretically impossible: not enough boxes.
+		if dirOrder is None:
+			dirOrder = self.DEFAULT_DIR_ORDER
+		self.checkSolveOptions(dirOrder, deadlockDepth)
+
+		if self._totalGoals > self._totalBoxes or any(
+			cell.type_ == CellType.GOAL and cell.state != CellState.BOX
+			for i, cell in enumerate(self._cells)
+			if i not in self._denseIndex
+		):
+			# Theoretically impossible: not enough boxes or unreachable goal.
 			self._solvable = False
+			self._totalNodes = 0
 			return self._solvable
 
 		# Save initial values.
 		cells = tuple(Cell(cell.type_, cell.state) for cell in self._cells)
 		runnerPos = self._runnerPos
 		unachievedGoals = self._unachievedGoals
+		nextDirs = self._nextDirs
+		savedDeadlockDepth = self._deadlockDepth
 
-		self._solve(optimal, logInterval)
+		self._nextDirs = self._getNextDirs(dirOrder)
+		self._deadlockDepth = deadlockDepth
+		if profiler is None:
+			self._totalNodes = self._solve(optimal, logInterval)
+		else:
+			with profiler.attached(type(self)):
+				self._totalNodes = self._solve(optimal, logInterval)
 
 		# Restore initial values.
-		self._cells = cells
+		self._setCells(cells)
 		self._runnerPos = runnerPos
 		self._unachievedGoals = unachievedGoals
+		self._pushableBoxes = None
+		self._nextDirs = nextDirs
+		self._deadlockDepth = savedDeadlockDepth
 
 		return self._solvable
 
-	def _getDeadCells(self) -> set[int]:
-		"""Prepare cells indices to which it makes no sense to move the box."""
-		deadCells: set[int] = set()
-		for i, cell in enumerate(self._cells):
-			# Dead cell is REGULAR cell that have > 2 WALL neighbours or 2
+	@staticmethod
+	def _getNextDirs(dirOrder: Sequence[MoveDir]) -> dict[MoveDir | None, MoveDir | None]:
+		"""Convert `dirOrder` to `self._nextDirs` format."""
+		return dict(zip((None, *dirOrder), (*dirOrder, None)))
+
+	def _getCornerCells(
+		self,
+		interior: Sequence[int],
+		neighbours: dict[MoveDir, tuple[int | None, ...]]
+	) -> frozenset[int]:
+		"""Prepare dense cells indices from which the box can't be moved at all.
+		Check `__slots__` for args description.
+		"""
+		cornerCells: set[int] = set()
+		for i, cellIndex in enumerate(interior):
+			# Corner is REGULAR cell that have > 2 WALL neighbours or 2
 			# adjacent WALL neighbours (where border must be treated as WALL)
-			if cell.type_ == CellType.REGULAR:
+			if self._cells[cellIndex].type_ == CellType.REGULAR:
 				wallNeighbours = set()
 				for moveDir in MoveDir:
-					targetCellIndex = self.getTargetCellIndex(i, moveDir)
-					if targetCellIndex is None or self._cells[targetCellIndex].type_ == CellType.WALL:
+					if neighbours[moveDir][i] is None:
 						wallNeighbours.add(moveDir)
 
 				if self._cellIsBlocked(wallNeighbours):
-					deadCells.add(i)
+					cornerCells.add(i)
+
+		return frozenset(cornerCells)
 
-		return deadCells
+	def _getDeadCells(self, interior: Sequence[int], pushDistances: distances.Matrix) -> frozenset[int]:
+		"""Prepare dense cells indices to which it makes no sense to move the box
+		if every box has to end up on a GOAL.
+		Check `__slots__` and `InteriorAnalysis` for args description.
+		"""
+		# Dead cell is REGULAR cell from which the box can't be pushed to any
+		# GOAL even if there are no other boxes. It covers corners and cells
+		# along walls without GOALs.
+		return frozenset(
+			i for i in distances.getUnreachableCells(pushDistances, len(interior))
+			if self._cells[interior[i]].type_ == CellType.REGULAR
+		)
+
+	def _getReachableCells(self) -> set[int]:
+		"""Get dense indices of cells the runner can reach without pushing boxes."""
+		reachable = {self._runnerPos}
+		stack = [self._runnerPos]
+		while stack:
+			i = stack.pop()
+			for moveDir in MoveDir:
+				targetCellIndex = self._neighbours[moveDir][i]
+				if (
+					targetCellIndex is not None
+					and targetCellIndex not in reachable
+					and self._interiorCells[targetCellIndex].isPassable()
+				):
+					reachable.add(targetCellIndex)
+					stack.append(targetCellIndex)
+
+		return reachable
+
+	def _analyseCorrals(self, deadCells: set[int], deadBoxes: set[int]) -> tuple[bool, set[int] | None]:
+		"""Find areas the runner can't reach (corrals) and boxes fencing them.
+
+		Returns:
+		- if some corral is dead: it has a goal, but all its fence boxes are
+		  dead, so nothing can ever get there;
+		- fence boxes of the smallest unsolved PI-corral (None if there is no
+		  such corral). PI-corral is a corral such that its fence boxes can be
+		  pushed only into the corral, and the runner can make all these pushes
+		  right now. At least one of its fence boxes must be pushed
+		  before the level can be solved, and pushing others doesn't help it,
+		  so only pushes of its fence boxes need to be checked.
+		"""
+		cells = self._interiorCells
+		reachable = self._getReachableCells()
+		visited = reachable.copy()
+		bestFence: set[int] | None = None
+		for start, cell in enumerate(cells):
+			if start in visited or not cell.isPassable():
+				continue
+
+			# Collect corral area and its fence.
+			area = {start}
+			stack = [start]
+			fence: set[int] = set()
+			hasGoal = False
+			while stack:
+				i = stack.pop()
+				hasGoal = hasGoal or cells[i].type_ == CellType.GOAL
+				for moveDir in MoveDir:
+					targetCellIndex = self._neighbours[moveDir][i]
+					if targetCellIndex is None or targetCellIndex in area:
+						continue
+
+					if cells[targetCellIndex].state == CellState.BOX:
+						fence.add(targetCellIndex)
+					else:
+						area.add(targetCellIndex)
+						stack.append(targetCellIndex)
+
+			visited |= area
+			if hasGoal and fence <= deadBoxes:
+				return True, None
+
+			if bestFence is not None and len(fence) >= len(bestFence):
+				continue
+
+			if not (
+				hasGoal
+				or self._totalBoxes == self._totalGoals
+				and any(cells[i].type_ != CellType.GOAL for i in fence)
+			):
+				# Solved corral: nothing has to be pushed into it.
+				continue
+
+			if self._isPICorral(area, fence, reachable, deadCells):
+				bestFence = fence
 
-	def _solve(self, optimal: bool, logInterval: int | None):
+		return False, bestFence
+
+	def _isPICorral(
+		self,
+		area: set[int],
+		fence: set[int],
+		reachable: set[int],
+		deadCells: set[int]
+	) -> bool:
+		"""Check `self._analyseCorrals` for details.
+
+		Pushes that are impossible forever (blocked by a WALL or leading to
+		a dead cell) are ignored. Pushes that may become possible later (blocked
+		by boxes or by unreachable cells) make corral not PI.
+		"""
+		hasPush = False
+		for i in fence:
+			for moveDir in MoveDir:
+				runnerCellIndex = self._neighbours[MoveDir.getOpposite(moveDir)][i]
+				followCellIndex = self._neighbours[moveDir][i]
+				if (
+					runnerCellIndex is None
+					or followCellIndex is None
+					or followCellIndex in deadCells
+				):
+					continue
+
+				if followCellIndex not in area or runnerCellIndex not in reachable:
+					return False
+				hasPush = True
+
+		return hasPush
+
+	def _solve(self, optimal: bool, logInterval: int | None) -> int:
 		"""Main part of `self.solve`: check it for args description.
 		Uses back-track search.
+		Returns number of checked search-nodes.
 		"""
 		self._solvable = False
 		self._winMoves = None
@@ -370,12 +916,16 @@ class Field:
 		checkedFields: dict[int, int] = {self.getFingerprint(): 0}
 		# Box is considered to be dead if it can not be moved in the future.
 		deadBoxes: set[int] = set()
-		if self.isDead(deadBoxes):
-			return
+		if self._isDead(deadBoxes):
+			return 0
 
 		moves: list[Move] = []
-		nextDir: None | MoveDir = None  # will be RIGHT on the first iteration
-		deadCells = self._getDeadCells()
+		nextDir: None | MoveDir = None  # will be the first of `dirOrder` on the first iteration
+		deadCells = self._deadCells
+		if not optimal:
+			corralIsDead, self._pushableBoxes = self._analyseCorrals(deadCells, deadBoxes)
+			if corralIsDead:
+				return 0
 
 		# Start solving
 		moveCounter = 0
@@ -383,22 +933,22 @@ class Field:
 		while True:
 			# General back-track case.
 			# Find next dir.
-			# On first iteration it will yield MoveDir.RIGHT
-			nextDir = MoveDir.getNext(nextDir)
+			# On first iteration it will yield the first of `dirOrder`
+			nextDir = self._nextDirs[nextDir]
 			while nextDir is None:
 				if not len(moves):
 					# All possible first moves checked.
-					return
+					return moveCounter
 				# Undo move
 				lastMove = moves.pop()
 				deadBoxes = self._undoMove(lastMove, deadBoxes)
-				nextDir = MoveDir.getNext(lastMove.dir_)
+				nextDir = self._nextDirs[lastMove.dir_]
 			nextDir: MoveDir
 
 			if self._unachievedGoals:
 				# Try move.
-				targetCellIndex = self.getTargetCellIndex(self._runnerPos, nextDir)
-				# Edge of the field
+				targetCellIndex = self._neighbours[nextDir][self._runnerPos]
+				# WALL or edge of the field
 				if targetCellIndex is None:
 					continue
 
@@ -421,7 +971,7 @@ class Field:
 				# a tuple, which is also will be casted to True.
 				if result is True:
 					# Either nothing else to check, or `optimal is False`.
-					return
+					return moveCounter
 				lastMove, deadBoxes, nextDir = result
 
 	def _checkStep(
@@ -453,30 +1003,35 @@ class Field:
 		`moveCounter`,
 		`logCounter`
 		"""
-		targetCell = self._cells[targetCellIndex]
+		cells = self._interiorCells
+		targetCell = cells[targetCellIndex]
 		isPassable = targetCell.isPassable()
-		followCellIndex = self.getTargetCellIndex(targetCellIndex, nextDir)
+		followCellIndex = self._neighbours[nextDir][targetCellIndex]
 		# Either passable cell, or box followed by passable cell
 		# and non-dead cell
 		if not (
 			isPassable
 			or targetCell.state == CellState.BOX
 			and followCellIndex is not None
-			and self._cells[followCellIndex].isPassable()
+			and cells[followCellIndex].isPassable()
 			and followCellIndex not in deadCells
+			and (self._pushableBoxes is None or targetCellIndex in self._pushableBoxes)
 		):
 			# Nothing was updated, actually.
 			return nextDir, deadBoxes, moveCounter, logCounter
 
 		# Do move
-		move = Move(MoveType.REGULAR if isPassable else MoveType.PUSH, nextDir)
+		if isPassable:
+			move = Move(MoveType.REGULAR, nextDir)
+		else:
+			move = Move(MoveType.PUSH, nextDir, savedPushableBoxes=self._pushableBoxes)
 		targetCell.state = CellState.RUNNER
-		self._cells[self._runnerPos].state = CellState.EMPTY
+		cells[self._runnerPos].state = CellState.EMPTY
 		if not isPassable:
-			self._cells[followCellIndex].state = CellState.BOX
+			cells[followCellIndex].state = CellState.BOX
 			if targetCell.type_ == CellType.GOAL:
 				self._unachievedGoals += 1
-			if self._cells[followCellIndex].type_ == CellType.GOAL:
+			if cells[followCellIndex].type_ == CellType.GOAL:
 				self._unachievedGoals -= 1
 
 		self._runnerPos = targetCellIndex
@@ -498,12 +1053,15 @@ class Field:
 			isDead = False
 			if move.type_ == MoveType.PUSH:
 				move.savedDeadBoxes = deadBoxes.copy()
-				isDead = self.isDead(deadBoxes)
+				isDead = self._isDead(deadBoxes)
+				# PI-corrals pruning doesn't preserve shortest solutions.
+				if not isDead and not optimal:
+					isDead, self._pushableBoxes = self._analyseCorrals(deadCells, deadBoxes)
 
 			if not isDead:
 				# 'Positive' case: add new move.
 				moves.append(move)
-				nextDir = None  # will be RIGHT on next iteration in _solve
+				nextDir = None  # will be the first of `dirOrder` on next iteration in _solve
 
 				moveCounter += 1
 				logCounter += 1
@@ -578,9 +1136,10 @@ class Field:
 
 		# Save initial values.
 		cells = tuple(Cell(cell.type_, cell.state) for cell in self._cells)
-		runnerPos = self._runnerPos
 		unachievedGoals = self._unachievedGoals
 
+		# Animation works with `self._cells` indices.
+		runnerPos = self._interior[self._runnerPos]
 		os.system("clear")
 		print(movesRepr)
 		print()
@@ -588,7 +1147,7 @@ class Field:
 		self.show()
 		time.sleep(delay + 2)
 		for i, move in enumerate(moves, start=1):
-			targetCellIndex = self.getTargetCellIndex(self._runnerPos, move.dir_)
+			targetCellIndex = self.getTargetCellIndex(runnerPos, move.dir_)
 			targetCell = self._cells[targetCellIndex]
 			if move.type_ == MoveType.PUSH:
 				followCellIndex = self.getTargetCellIndex(targetCellIndex, move.dir_)
@@ -596,8 +1155,8 @@ class Field:
 				followCell.state = CellState.BOX
 
 			targetCell.state = CellState.RUNNER
-			self._cells[self._runnerPos].state = CellState.EMPTY
-			self._runnerPos = targetCellIndex
+			self._cells[runnerPos].state = CellState.EMPTY
+			runnerPos = targetCellIndex
 
 			os.system("clear")
 			print(movesRepr)
@@ -607,8 +1166,7 @@ class Field:
 			time.sleep(delay)
 
 		# Restore initial values.
-		self._cells = cells
-		self._runnerPos = runnerPos
+		self._setCells(cells)
 		self._unachievedGoals = unachievedGoals
 
 	def showSolution(self, delay: float = 1.0):
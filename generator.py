@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Random solvable level generator.
+
+Levels are built backwards: boxes are placed on goals and then pulled away
+by the runner. Every pull is a reversed push, so playing the pulls backwards
+always solves the level.
+"""
+
+import os
+import random
+from typing import Iterable, Optional
+
+from cell import CellType, CellState, Cell
+from field import Field
+from move import MoveDir
+
+
+def _getTargetCellIndex(pos: int, moveDir: MoveDir, n: int, m: int) -> int | None:
+	"""Same as `Field.getTargetCellIndex` for the field that doesn't exist yet."""
+	y, x = divmod(pos, n)
+
+	if moveDir == MoveDir.RIGHT:
+		x += 1
+	elif moveDir == MoveDir.UP:
+		y -= 1
+	elif moveDir == MoveDir.LEFT:
+		x -= 1
+	elif moveDir == MoveDir.DOWN:
+		y += 1
+
+	if not (0 <= x < n and 0 <= y < m):
+		return None
+
+	return y * n + x
+
+
+def _getLargestArea(types: list[CellType], n: int, m: int) -> list[int]:
+	"""Get indices of the largest connected area of non-WALL cells."""
+	largest: list[int] = []
+	visited: set[int] = set()
+	for start, type_ in enumerate(types):
+		if type_ == CellType.WALL or start in visited:
+			continue
+
+		area = [start]
+		visited.add(start)
+		for i in area:
+			for moveDir in MoveDir:
+				targetCellIndex = _getTargetCellIndex(i, moveDir, n, m)
+				if (
+					targetCellIndex is not None
+					and targetCellIndex not in visited
+					and types[targetCellIndex] != CellType.WALL
+				):
+					visited.add(targetCellIndex)
+					area.append(targetCellIndex)
+
+		if len(area) > len(largest):
+			largest = area
+
+	return largest
+
+
+def generateLevel(
+	n: int,  # number of field columns
+	m: int,  # number of field rows
+	wallDensity: float = 0.2,
+	totalBoxes: int = 3,
+	seed: Optional[int] = None,
+	pulls: Optional[int] = None,
+	maxAttempts: int = 100
+) -> Field:
+	"""Generate random solvable level.
+
+	`wallDensity` is a probability of each cell to be a WALL. Cells that are
+	not connected to the largest open area are turned into WALLs as well.
+
+	`pulls` is a number of box pulls made from the goal configuration
+	(defaults to `10 * totalBoxes`). Bigger values give harder levels
+	in general, but not necessarily.
+
+	Same `seed` (and other args) always gives the same level.
+	"""
+	if not isinstance(n, int) or not isinstance(m, int) or n <= 0 or m <= 0:
+		raise ValueError("`n` and `m` must be positive ints")
+	if not 0 <= wallDensity < 1:
+		raise ValueError("`wallDensity` must be in [0, 1)")
+	if not isinstance(totalBoxes, int) or totalBoxes <= 0:
+		raise ValueError("`totalBoxes` must be positive int")
+
+	if pulls is None:
+		pulls = 10 * totalBoxes
+
+	rng = random.Random(seed)
+	for _ in range(maxAttempts):
+		types = [
+			CellType.WALL if rng.random() < wallDensity else CellType.REGULAR
+			for _ in range(n * m)
+		]
+		area = _getLargestArea(types, n, m)
+		# Boxes need some space around them to be pulled.
+		if len(area) < 2 * totalBoxes + 1:
+			continue
+
+		areaSet = set(area)
+		for i in range(n * m):
+			if i not in areaSet:
+				types[i] = CellType.WALL
+
+		goals = rng.sample(area, totalBoxes)
+		for i in goals:
+			types[i] = CellType.GOAL
+		boxes = set(goals)
+		runnerPos = rng.choice([i for i in area if i not in boxes])
+
+		# Walk randomly and pull boxes whenever possible.
+		pullsDone = 0
+		for _ in range(20 * pulls):
+			if pullsDone >= pulls:
+				break
+
+			moveDir = rng.choice(tuple(MoveDir))
+			targetCellIndex = _getTargetCellIndex(runnerPos, moveDir, n, m)
+			if (
+				targetCellIndex is None
+				or types[targetCellIndex] == CellType.WALL
+				or targetCellIndex in boxes
+			):
+				continue
+
+			behindCellIndex = _getTargetCellIndex(runnerPos, MoveDir.getOpposite(moveDir), n, m)
+			if behindCellIndex in boxes and rng.random() < 0.8:
+				boxes.remove(behindCellIndex)
+				boxes.add(runnerPos)
+				pullsDone += 1
+
+			runnerPos = targetCellIndex
+
+		if all(types[i] == CellType.GOAL for i in boxes):
+			# Nothing to solve: try again.
+			continue
+
+		return Field(n, (
+			Cell(
+				type_,
+				CellState.RUNNER if i == runnerPos
+				else CellState.BOX if i in boxes
+				else CellState.EMPTY
+			)
+			for i, type_ in enumerate(types)
+		))
+
+	raise ValueError(f"Failed to generate level in {maxAttempts} attempts, try other args")
+
+
+def generateLevels(
+	count: int,
+	n: int,
+	m: int,
+	wallDensity: float = 0.2,
+	totalBoxes: int = 3,
+	seed: Optional[int] = None,
+	pulls: Optional[int] = None
+) -> Iterable[Field]:
+	"""Generate `count` levels. For args description check `generateLevel`."""
+	rng = random.Random(seed)
+	for _ in range(count):
+		yield generateLevel(n, m, wallDensity, totalBoxes, rng.getrandbits(64), pulls)
+
+
+def writeLevels(directory: str, fields: Iterable[Field], prefix: str = "level") -> list[str]:
+	"""Save fields as text files (check `Field.toText`) and return their paths."""
+	os.makedirs(directory, exist_ok=True)
+	paths = []
+	for i, field in enumerate(fields):
+		path = os.path.join(directory, f"{prefix}_{i:04}.txt")
+		with open(path, "w") as f:
+			f.write(field.toText())
+			f.write("\n")
+		paths.append(path)
+
+	return paths
+
+
+def readLevel(path: str) -> Field:
+	"""Inverse of `writeLevels` for one file."""
+	with open(path) as f:
+		return Field.fromText(f.read())
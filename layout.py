@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Static layout analysis shared between fields.
+
+Everything here depends only on dimensions, WALLs and GOALs of the field
+(check `Field.getLayoutKey`), so fields that differ only in boxes and runner
+positions reuse it.
+"""
+
+import os
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from distances import Matrix, Neighbours
+
+
+class InteriorAnalysis:
+	"""Static facts about one connected area of non-WALL cells.
+	Check `Field.__slots__` for attributes description.
+	"""
+
+	__slots__ = (
+		'interior',
+		'denseIndex',
+		'neighbours',
+		'deadCells',
+		# : frozenset[int]
+		# Dense indices of corners: `deadCells` for fields with more boxes
+		# than GOALs.
+		'cornerCells',
+		# : tuple[int, ...]
+		# Dense indices of GOALs.
+		'goals',
+		# : Matrix
+		# Check `distances.getPushDistances`: rows are in `goals` order.
+		'pushDistances',
+		# : Matrix | None
+		# Check `distances.getWalkDistances`. Calculated on demand.
+		'walkDistances',
+	)
+
+	def __init__(
+		self,
+		interior: tuple[int, ...],
+		denseIndex: dict[int, int],
+		neighbours: Neighbours,
+		deadCells: frozenset[int],
+		cornerCells: frozenset[int],
+		goals: tuple[int, ...],
+		pushDistances: Matrix
+	):
+		self.interior = interior
+		self.denseIndex = denseIndex
+		self.neighbours = neighbours
+		self.deadCells = deadCells
+		self.cornerCells = cornerCells
+		self.goals = goals
+		self.pushDistances = pushDistances
+		self.walkDistances = None
+
+
+class LayoutAnalysis:
+	"""Static facts about all areas of the layout."""
+
+	__slots__ = 'componentOf', 'interiors'
+
+	def __init__(
+		self,
+		# Non-WALL cell index to index of its area in `interiors` relation.
+		componentOf: dict[int, int],
+		interiors: tuple[InteriorAnalysis, ...]
+	):
+		self.componentOf = componentOf
+		self.interiors = interiors
+
+	def getInterior(self, i: int) -> InteriorAnalysis:
+		"""Get analysis of the area that contains cell with index `i`."""
+		return self.interiors[self.componentOf[i]]
+
+
+class LayoutCache:
+	"""Process-level LRU cache of `LayoutAnalysis` by layout key,
+	optionally backed by pickle files in `directory`.
+	"""
+
+	# Version of `LayoutAnalysis` format in files. Bump it on any change of
+	# analysis classes or their contents, so that older files are ignored.
+	FORMAT_VERSION = 2
+
+	__slots__ = (
+		# : int
+		'_maxSize',
+		# : str | None
+		'_directory',
+		# : OrderedDict[str, LayoutAnalysis]
+		# Least recently used first.
+		'_entries',
+		# : threading.Lock
+		'_lock',
+	)
+
+	def __init__(self, maxSize: int = 128, directory: Optional[str] = None):
+		if not isinstance(maxSize, int) or maxSize <= 0:
+			raise ValueError("`maxSize` must be positive int")
+
+		self._maxSize = maxSize
+		self._directory = directory
+		self._entries: OrderedDict[str, LayoutAnalysis] = OrderedDict()
+		self._lock = threading.Lock()
+
+	def __len__(self) -> int:
+		return len(self._entries)
+
+	def _getPath(self, key: str) -> str:
+		return os.path.join(self._directory, f"{key}.v{self.FORMAT_VERSION}.layout")
+
+	def _load(self, key: str) -> LayoutAnalysis | None:
+		if self._directory is None:
+			return None
+
+		try:
+			with open(self._getPath(key), "rb") as f:
+				analysis = pickle.load(f)
+		except Exception:
+			# Broken or stale file (e.g. written with NumPy, which isn't
+			# installed now): just calculate again.
+			return None
+
+		return analysis if isinstance(analysis, LayoutAnalysis) else None
+
+	def _save(self, key: str, analysis: LayoutAnalysis) -> None:
+		if self._directory is None:
+			return
+
+		os.makedirs(self._directory, exist_ok=True)
+		path = self._getPath(key)
+		# Write to temporary file first, so that concurrent runs never see
+		# incomplete file.
+		tmpPath = f"{path}.{os.getpid()}.tmp"
+		with open(tmpPath, "wb") as f:
+			pickle.dump(analysis, f)
+		os.replace(tmpPath, path)
+
+	def get(self, key: str, build: Callable[[], LayoutAnalysis]) -> LayoutAnalysis:
+		"""Get analysis by `key`, call `build` if it's neither in memory
+		nor on disk.
+		"""
+		with self._lock:
+			analysis = self._entries.get(key)
+			if analysis is not None:
+				self._entries.move_to_end(key)
+				return analysis
+
+		analysis = self._load(key)
+		if analysis is None:
+			analysis = build()
+			self._save(key, analysis)
+
+		with self._lock:
+			self._entries[key] = analysis
+			if len(self._entries) > self._maxSize:
+				self._entries.popitem(last=False)
+
+		return analysis
+
+	def clear(self) -> None:
+		"""Clear in-memory entries. Files on disk stay."""
+		with self._lock:
+			self._entries.clear()
@@ -10,12 +10,23 @@ from typing import Optional
 
 from cell import Cell
 from field import Field
+from profiler import Profiler
 
 
-def solve(field: Field, optimal: bool = False, logInterval: Optional[int] = None):
+def solve(
+	field: Field,
+	optimal: bool = False,
+	logInterval: Optional[int] = None,
+	profile: bool = False,
+	foldedPath: Optional[str] = None
+):
 	"""Solve the puzzle. Interactively ask user to show solution.
 
-	For args description check `Field.solve`.
+	For `optimal` and `logInterval` description check `Field.solve`.
+
+	If `profile` is True - prints per-phase time breakdown of the solver
+	and writes folded stacks (for flamegraph tools) to `foldedPath`
+	if it's not None.
 	"""
 	field.show()
 	print()
@@ -23,10 +34,20 @@ def solve(field: Field, optimal: bool = False, logInterval: Optional[int] = None
 	# field.showWithDeadBoxes()
 	print("Processing, wait...")
 
+	profiler = Profiler() if profile else None
 	t0 = time.time()
-	if field.solve(optimal, logInterval):
+	solvable = field.solve(optimal, logInterval, profiler)
+	seconds = time.time() - t0
+	if profiler is not None:
+		print()
+		profiler.report()
+		if foldedPath is not None:
+			profiler.writeFolded(foldedPath)
+			print(f"Folded stacks saved to {foldedPath}")
+
+	if solvable:
 		print()
-		print(f"Checked in {time.time() - t0:.2f} seconds")
+		print(f"Checked in {seconds:.2f} seconds")
 		print(f"Solution with {field.getTotalWinMoves()} total moves found. Show? y/n")
 		answer = input()
 		if answer == "y":
@@ -37,7 +58,7 @@ def solve(field: Field, optimal: bool = False, logInterval: Optional[int] = None
 			field.showSolution(delay=0.3)
 	else:
 		print()
-		print(f"Checked in {time.time() - t0:.2f} seconds")
+		print(f"Checked in {seconds:.2f} seconds")
 		print("There is no solution :(")
 
 
@@ -86,6 +107,7 @@ def main():
 	])
 
 	solve(field, optimal=False, logInterval=1000_000)
+	# solve(field, profile=True, foldedPath="solve.folded")
 
 	# field.showAnimation(moves="RDulLUlDrDRRuULuRlL", delay=0.3)
 
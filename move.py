@@ -54,18 +54,21 @@ class MoveDir(Enum):
 
 
 class Move:
-	__slots__ = 'type_', 'dir_', 'savedDeadBoxes'
+	__slots__ = 'type_', 'dir_', 'savedDeadBoxes', 'savedPushableBoxes'
 
 	def __init__(
 		self,
 		type_: MoveType,
 		dir_: MoveDir,
 		# Set of permanently blocked boxes BEFORE this move.
-		savedDeadBoxes: Optional[set[int]] = None
+		savedDeadBoxes: Optional[set[int]] = None,
+		# Set of boxes allowed to be pushed BEFORE this move (None means any).
+		savedPushableBoxes: Optional[set[int]] = None
 	):
 		self.type_ = type_
 		self.dir_ = dir_
 		self.savedDeadBoxes = savedDeadBoxes
+		self.savedPushableBoxes = savedPushableBoxes
 
 	def __str__(self) -> str:
 		return str(self.dir_) if self.type_ == MoveType.PUSH else str(self.dir_).lower()
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Pattern databases: exact costs (in pushes) to bring a few boxes onto a fixed
+group of goals, ignoring all other boxes.
+
+Costs are calculated once per static layout by backward search (pulling
+boxes away from the goals) and stored in memory-mapped files, so repeated
+runs on the same layout just map them.
+
+Databases work with the same dense indices of interior cells as the solver
+(check `Field.__slots__`): cells outside of the interior can never hold
+a movable box, so they would only blow up the number of placements.
+"""
+
+import itertools
+import mmap
+import os
+import struct
+from math import comb
+from typing import Iterable, Optional, Sequence, Self
+
+from distances import Neighbours
+from move import MoveDir
+
+
+class PatternDatabase:
+	"""Costs for all placements of `len(goals)` boxes on interior cells.
+
+	Placement of k boxes (sorted dense indices c1 < ... < ck) is stored at
+	index C(c1, 1) + ... + C(ck, k), one byte per placement.
+	"""
+
+	# Cost of placements from which the goals can't be covered.
+	INFINITE = 255
+
+	_MAGIC = b"SOKPDB2\0"
+	# Magic, number of interior cells, number of goals.
+	_HEADER = struct.Struct("<8sII")
+
+	__slots__ = (
+		# : tuple[int, ...]
+		# Goals (dense indices) that have to be covered.
+		'_goals',
+		# : int
+		# Number of interior cells.
+		'_size',
+		# : bytes | bytearray | memoryview
+		# Costs of all placements.
+		'_costs',
+		# : mmap.mmap | None
+		# Underlying file mapping if costs were loaded from disk.
+		'_mmap',
+	)
+
+	def __init__(
+		self,
+		goals: Sequence[int],
+		size: int,
+		costs: bytes | bytearray | memoryview,
+		mmap_: Optional[mmap.mmap] = None
+	):
+		if len(costs) != comb(size, len(goals)):
+			raise ValueError("`costs` size doesn't match number of placements")
+
+		self._goals = tuple(goals)
+		self._size = size
+		self._costs = costs
+		self._mmap = mmap_
+
+	@property
+	def goals(self) -> tuple[int, ...]:
+		return self._goals
+
+	@staticmethod
+	def _getPlacementIndex(cells: Iterable[int]) -> int:
+		"""`cells` must be sorted."""
+		return sum(comb(c, j) for j, c in enumerate(cells, start=1))
+
+	@classmethod
+	def build(cls, neighbours: Neighbours, goals: Sequence[int]) -> Self:
+		"""Calculate costs for interior given by `neighbours` tables (check
+		`Field.__slots__`).
+		"""
+		size = len(neighbours[MoveDir.RIGHT])
+		if not goals or len(set(goals)) != len(goals) or any(not 0 <= i < size for i in goals):
+			raise ValueError("`goals` must be non-empty sequence of different interior cells")
+
+		# Cell to its neighbours (-1 for WALLs and edges) in each direction.
+		adjacency: list[tuple[int, ...]] = [
+			tuple(-1 if neighbours[moveDir][f] is None else neighbours[moveDir][f] for moveDir in MoveDir)
+			for f in range(size)
+		]
+
+		def getRegion(boxes: tuple[int, ...], start: int) -> list[int]:
+			region = [start]
+			visited = {start, *boxes}
+			for f in region:
+				for g in adjacency[f]:
+					if g >= 0 and g not in visited:
+						visited.add(g)
+						region.append(g)
+			return region
+
+		costs = bytearray([cls.INFINITE]) * comb(size, len(goals))
+		# State is (boxes, min cell of runner region).
+		goalBoxes = tuple(sorted(goals))
+		costs[cls._getPlacementIndex(goalBoxes)] = 0
+		checked: set[tuple[tuple[int, ...], int]] = set()
+		layer: list[tuple[tuple[int, ...], list[int]]] = []
+		covered = set(goalBoxes)
+		# Runner may finish in any region.
+		for f in range(size):
+			if f in covered:
+				continue
+			region = getRegion(goalBoxes, f)
+			covered.update(region)
+			layer.append((goalBoxes, region))
+			checked.add((goalBoxes, min(region)))
+
+		# Backward BFS by pulls.
+		cost = 0
+		while layer:
+			cost += 1
+			nextLayer = []
+			for boxes, region in layer:
+				regionSet = set(region)
+				for k, box in enumerate(boxes):
+					for d in range(4):
+						runnerPos = adjacency[box][d]
+						if runnerPos not in regionSet:
+							continue
+						nextRunnerPos = adjacency[runnerPos][d]
+						if nextRunnerPos < 0 or nextRunnerPos in boxes:
+							continue
+
+						newBoxes = tuple(sorted((*boxes[:k], runnerPos, *boxes[k+1:])))
+						newRegion = getRegion(newBoxes, nextRunnerPos)
+						state = (newBoxes, min(newRegion))
+						if state in checked:
+							continue
+
+						checked.add(state)
+						nextLayer.append((newBoxes, newRegion))
+						placementIndex = cls._getPlacementIndex(newBoxes)
+						if costs[placementIndex] == cls.INFINITE:
+							costs[placementIndex] = min(cost, cls.INFINITE - 1)
+
+			layer = nextLayer
+
+		return cls(goals, size, costs)
+
+	def save(self, path: str) -> None:
+		with open(path, "wb") as f:
+			f.write(self._HEADER.pack(self._MAGIC, self._size, len(self._goals)))
+			f.write(struct.pack(f"<{len(self._goals)}I", *self._goals))
+			f.write(self._costs)
+
+	@classmethod
+	def load(cls, path: str, size: int) -> Self:
+		"""Map costs saved by `self.save` for the same interior of `size`
+		cells.
+		"""
+		with open(path, "rb") as f:
+			# Raises ValueError for empty file.
+			mmap_ = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			magic, size_, totalGoals = cls._HEADER.unpack_from(mmap_)
+			if magic != cls._MAGIC or size_ != size:
+				raise ValueError("wrong header")
+
+			offset = cls._HEADER.size
+			goals = struct.unpack_from(f"<{totalGoals}I", mmap_, offset)
+			offset += 4 * totalGoals
+			if len(mmap_) - offset != comb(size, totalGoals):
+				raise ValueError("wrong size")
+		except (struct.error, ValueError) as e:
+			mmap_.close()
+			raise ValueError(f"{path} is not a pattern database for this layout: {e}") from e
+
+		return cls(goals, size, memoryview(mmap_)[offset:], mmap_)
+
+	@classmethod
+	def forLayout(
+		cls,
+		neighbours: Neighbours,
+		goals: Sequence[int],
+		interiorKey: str,
+		directory: Optional[str] = None
+	) -> Self:
+		"""Load costs from `directory` if they are there, otherwise build
+		and save them. Don't use disk at all if `directory` is None.
+
+		`interiorKey` must identify the interior between runs.
+		"""
+		if directory is None:
+			return cls.build(neighbours, goals)
+
+		size = len(neighbours[MoveDir.RIGHT])
+		path = os.path.join(directory, f"{interiorKey}_{'-'.join(map(str, sorted(goals)))}.pdb")
+		if os.path.exists(path):
+			try:
+				database = cls.load(path, size)
+			except ValueError:
+				# Truncated or stale file: build it again.
+				pass
+			else:
+				if sorted(database.goals) == sorted(goals):
+					return database
+				database.close()
+
+		os.makedirs(directory, exist_ok=True)
+		# Write to temporary file first, so that concurrent runs never
+		# see incomplete database.
+		tmpPath = f"{path}.{os.getpid()}.tmp"
+		cls.build(neighbours, goals).save(tmpPath)
+		os.replace(tmpPath, path)
+
+		return cls.load(path, size)
+
+	def close(self) -> None:
+		if self._mmap is not None:
+			self._costs.release()
+			self._mmap.close()
+			self._mmap = None
+
+	def _getCosts(self, boxes: Iterable[int]) -> Iterable[int]:
+		"""Generate costs of all placements of boxes subsets of `len(goals)` size."""
+		for placement in itertools.combinations(sorted(boxes), len(self._goals)):
+			yield self._costs[self._getPlacementIndex(placement)]
+
+	def isDeadFor(self, boxes: Iterable[int]) -> bool:
+		"""Check if the goals can't be covered by any of `boxes` (dense indices)."""
+		return all(cost == self.INFINITE for cost in self._getCosts(boxes))
+
+	def getLowerBound(self, boxes: Iterable[int]) -> int | None:
+		"""Get min number of pushes needed to cover the goals with `boxes`
+		(dense indices). None if they can't be covered.
+		"""
+		cost = min(self._getCosts(boxes), default=self.INFINITE)
+		return None if cost == self.INFINITE else cost
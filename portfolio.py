@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel strategy portfolio: solve the same field with several solver
+configurations at once (one process per configuration) and take the first
+or the best answer.
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+from typing import Optional, Sequence
+
+from field import Field
+from move import MoveDir
+
+
+# Max seconds between checks of processes state.
+_POLL_INTERVAL = 1.0
+
+
+class SolverConfig:
+	"""Set of `Field.solve` args. Check it for args description."""
+
+	__slots__ = 'name', 'optimal', 'dirOrder', 'deadlockDepth'
+
+	def __init__(
+		self,
+		name: str,
+		optimal: bool = False,
+		dirOrder: Optional[Sequence[MoveDir]] = None,
+		deadlockDepth: Optional[int] = None
+	):
+		Field.checkSolveOptions(dirOrder, deadlockDepth)
+
+		self.name = name
+		self.optimal = optimal
+		self.dirOrder = None if dirOrder is None else tuple(dirOrder)
+		self.deadlockDepth = deadlockDepth
+
+	def __str__(self) -> str:
+		return self.name
+
+
+DEFAULT_CONFIGS = (
+	SolverConfig("default"),
+	SolverConfig("dulr", dirOrder=(MoveDir.DOWN, MoveDir.UP, MoveDir.LEFT, MoveDir.RIGHT)),
+	SolverConfig("ldru", dirOrder=(MoveDir.LEFT, MoveDir.DOWN, MoveDir.RIGHT, MoveDir.UP)),
+	SolverConfig("shallow-deadlocks", deadlockDepth=1),
+	SolverConfig("optimal", optimal=True),
+)
+
+
+class PortfolioResult:
+	__slots__ = 'config', 'solvable', 'moves', 'totalNodes', 'seconds'
+
+	def __init__(
+		self,
+		config: SolverConfig,
+		solvable: bool,
+		moves: str | None,  # in `Field.getWinMovesRepr` format
+		totalNodes: int,
+		seconds: float
+	):
+		self.config = config
+		self.solvable = solvable
+		self.moves = moves
+		self.totalNodes = totalNodes
+		self.seconds = seconds
+
+
+def _runConfig(field: Field, config: SolverConfig, index: int, results: multiprocessing.Queue) -> None:
+	"""Process target: solve `field` with `config` and report to `results`:
+	(index, solvable, moves, total nodes) or (index, None, error, None).
+	"""
+	try:
+		solvable = field.solve(
+			config.optimal,
+			dirOrder=config.dirOrder,
+			deadlockDepth=config.deadlockDepth
+		)
+	except Exception as e:
+		results.put((index, None, f"{type(e).__name__}: {e}", None))
+	else:
+		results.put((index, solvable, field.getWinMovesRepr(), field.totalNodes))
+
+
+def solvePortfolio(
+	field: Field,
+	configs: Sequence[SolverConfig] = DEFAULT_CONFIGS,
+	timeBudget: Optional[float] = None,
+	best: bool = False,
+	processes: Optional[int] = None
+) -> PortfolioResult | None:
+	"""Race `configs` on `field` running up to `processes` (CPU count by
+	default) of them at once.
+
+	If `best` is False - returns the first answer. Otherwise, waits for all
+	configs (but no longer than `timeBudget` seconds) and returns the shortest
+	solution found.
+
+	Any config proving that there is no solution finishes the race, because
+	all configs search exhaustively.
+
+	Unfinished configs are cancelled. Returns None if nothing was found
+	within `timeBudget`. Configs that fail are skipped, RuntimeError is
+	raised if all of them fail.
+	"""
+	if not configs:
+		raise ValueError("`configs` must be non-empty")
+	for config in configs:
+		Field.checkSolveOptions(config.dirOrder, config.deadlockDepth)
+
+	if processes is None:
+		processes = os.cpu_count() or 1
+
+	t0 = time.time()
+	results = multiprocessing.Queue()
+	pending = list(enumerate(configs))
+	running: dict[int, multiprocessing.Process] = {}
+	bestResult: PortfolioResult | None = None
+	# Config index to error description.
+	errors: dict[int, str] = {}
+	try:
+		while pending or running:
+			while pending and len(running) < processes:
+				index, config = pending.pop(0)
+				process = multiprocessing.Process(
+					target=_runConfig, args=(field, config, index, results), daemon=True
+				)
+				process.start()
+				running[index] = process
+
+			timeout = None if timeBudget is None else t0 + timeBudget - time.time()
+			if timeout is not None and timeout <= 0:
+				break
+			try:
+				# Wake up from time to time to notice processes that died
+				# without reporting (killed, crashed interpreter).
+				index, solvable, moves, totalNodes = results.get(
+					timeout=_POLL_INTERVAL if timeout is None else min(timeout, _POLL_INTERVAL)
+				)
+			except queue.Empty:
+				for index, process in list(running.items()):
+					if process.exitcode not in (None, 0):
+						del running[index]
+						errors[index] = f"Process exited with code {process.exitcode}"
+				continue
+
+			running.pop(index).join()
+			if solvable is None:
+				errors[index] = moves
+				continue
+
+			result = PortfolioResult(configs[index], solvable, moves, totalNodes, time.time() - t0)
+			if not solvable or not best:
+				return result
+			if bestResult is None or len(moves) < len(bestResult.moves):
+				bestResult = result
+	finally:
+		for process in running.values():
+			process.terminate()
+		for process in running.values():
+			process.join()
+
+	if len(errors) == len(configs):
+		raise RuntimeError("All configs failed: " + "; ".join(
+			f"{configs[index]}: {error}" for index, error in sorted(errors.items())
+		))
+
+	return bestResult
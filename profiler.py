@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in sampling solver profiler.
+
+While attached, a profiling timer interrupts the solver every `interval`
+seconds of CPU time, and the signal handler records the chain of `Field`
+methods on the call stack. Solver methods themselves are never wrapped, so
+even tiny hot ones (e.g. `Field.getFingerprint`) are measured without
+inflating their time, and regular solving has no overhead at all.
+
+Uses `signal.setitimer`, so it works on Unix only and in the main thread.
+"""
+
+import signal
+import time
+import types
+from contextlib import contextmanager
+from typing import Iterator
+
+
+class Profiler:
+	"""Per-phase time breakdown of `Field.solve` with folded-stack output.
+	Phases are all `Field` methods.
+
+	Usage:
+		profiler = Profiler()
+		field.solve(profiler=profiler)
+		profiler.report()
+		profiler.writeFolded("solve.folded")
+
+	Folded output can be read by standard flamegraph tools, e.g.
+	`flamegraph.pl solve.folded > solve.svg`.
+	"""
+
+	# Root of all stacks: everything in `Field._solve` that isn't covered
+	# by other phases, i.e. search bookkeeping.
+	ROOT_PHASE = "_solve"
+
+	# Default sampling interval in seconds of CPU time.
+	DEFAULT_INTERVAL = 0.001
+
+	__slots__ = (
+		# : float
+		# Sampling interval in seconds of CPU time.
+		'_interval',
+		# : float
+		# `time.process_time()` value at the last sample.
+		'_lastTime',
+		# : dict[types.CodeType, str]
+		# Code of each method of the profiled class to its name.
+		'_phases',
+		# : dict[tuple[str, ...], float]
+		# Self time (in seconds) of each stack.
+		'_selfTimes',
+		# : dict[tuple[str, ...], int]
+		# Number of samples of each stack.
+		'_samples',
+	)
+
+	def __init__(self, interval: float = DEFAULT_INTERVAL):
+		if not isinstance(interval, (int, float)) or interval <= 0:
+			raise ValueError("`interval` must be positive number")
+
+		self._interval = interval
+		self._lastTime = 0.0
+		self._phases: dict[types.CodeType, str] = {}
+		self._selfTimes: dict[tuple[str, ...], float] = {}
+		self._samples: dict[tuple[str, ...], int] = {}
+
+	def _sample(self, signum: int, frame: types.FrameType | None) -> None:
+		"""Signal handler: charge CPU time since the previous sample to the
+		current stack of phases. Actual time is used, because timers may be
+		coarser than `self._interval`.
+		"""
+		now = time.process_time()
+		seconds = now - self._lastTime
+		self._lastTime = now
+		stack = []
+		while frame is not None:
+			phase = self._phases.get(frame.f_code)
+			if phase is not None:
+				stack.append(phase)
+				if phase == self.ROOT_PHASE:
+					break
+			frame = frame.f_back
+		else:
+			# Not inside the solver.
+			return
+
+		key = tuple(reversed(stack))
+		self._selfTimes[key] = self._selfTimes.get(key, 0.0) + seconds
+		self._samples[key] = self._samples.get(key, 0) + 1
+
+	@contextmanager
+	def attached(self, cls: type) -> Iterator[None]:
+		"""Sample methods of `cls` inside the context."""
+		if not hasattr(signal, "setitimer"):
+			raise RuntimeError("Profiling needs `signal.setitimer`, which isn't available")
+
+		for name, member in cls.__dict__.items():
+			if isinstance(member, (staticmethod, classmethod)):
+				member = member.__func__
+			if isinstance(member, types.FunctionType):
+				self._phases[member.__code__] = name
+
+		previousHandler = signal.signal(signal.SIGPROF, self._sample)
+		self._lastTime = time.process_time()
+		signal.setitimer(signal.ITIMER_PROF, self._interval, self._interval)
+		try:
+			yield
+		finally:
+			signal.setitimer(signal.ITIMER_PROF, 0)
+			signal.signal(signal.SIGPROF, previousHandler)
+
+	def getBreakdown(self) -> dict[str, tuple[float, float, int]]:
+		"""Get phase to (self seconds, total seconds, samples) relation.
+		Samples are counted where the phase is on the top of the stack.
+
+		Total time of recursive phases is counted once per sample.
+		"""
+		breakdown: dict[str, list] = {}
+		for stack, seconds in self._selfTimes.items():
+			selfPhase = stack[-1]
+			values = breakdown.setdefault(selfPhase, [0.0, 0.0, 0])
+			values[0] += seconds
+			values[2] += self._samples[stack]
+			for phase in set(stack):
+				breakdown.setdefault(phase, [0.0, 0.0, 0])[1] += seconds
+
+		return {phase: tuple(values) for phase, values in breakdown.items()}
+
+	def report(self) -> None:
+		"""Print per-phase time breakdown sorted by self time."""
+		breakdown = self.getBreakdown()
+		totalSeconds = sum(self._selfTimes.values()) or 1.0
+		print(f"{'phase':<20} {'self, s':>9} {'self, %':>8} {'total, s':>9} {'samples':>12}")
+		for phase, (selfSeconds, seconds, samples) in sorted(
+			breakdown.items(), key=lambda item: item[1][0], reverse=True
+		):
+			print(
+				f"{phase:<20} {selfSeconds:>9.3f} {100 * selfSeconds / totalSeconds:>8.1f}"
+				f" {seconds:>9.3f} {samples:>12_}"
+			)
+
+	def writeFolded(self, path: str) -> None:
+		"""Write self times in folded-stack format (in microseconds)."""
+		with open(path, "w") as f:
+			for stack, seconds in self._selfTimes.items():
+				microseconds = round(seconds * 1_000_000)
+				if microseconds:
+					f.write(f"{';'.join(stack)} {microseconds}\n")
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Compact encodings of fields and moves.
+
+Text: run-length encoding, e.g. "xxxx" is "4x". Fields use `Field.toText`
+symbols with rows separated by "|", moves use `Field.getWinMovesRepr`
+symbols.
+
+Binary field: header (check `FIELD_HEADER`) and three bitmasks of WALLs,
+GOALs and boxes, one bit per cell, least significant bit first.
+
+Binary moves: 2 bits per move direction, 4 moves per byte, first move in the
+least significant bits. Move types are not stored: a move is a push if
+there is a box in front of the runner (check `Field.getMovesFromDirs`).
+
+Decoding accepts any buffer (bytes, memoryview of mmap, ...) and reads it
+without copying the whole buffer.
+"""
+
+import itertools
+import re
+import struct
+from typing import Iterable
+
+from move import MoveDir
+
+
+# Number of field columns, number of field rows, runner position.
+FIELD_HEADER = struct.Struct("<HHI")
+
+ROW_SEPARATOR = "|"
+
+# Index of each direction is its 2-bit code.
+_DIRS = tuple(MoveDir)
+_DIR_CODES = {moveDir: code for code, moveDir in enumerate(_DIRS)}
+# Byte to the 4 directions it contains.
+_BYTE_DIRS = tuple(
+	tuple(_DIRS[(byte >> shift) & 3] for shift in range(0, 8, 2))
+	for byte in range(256)
+)
+
+_RUN_PATTERN = re.compile(r"(\d*)(\D)")
+
+Buffer = bytes | bytearray | memoryview
+
+
+def rleEncode(text: str) -> str:
+	"""Replace runs of 2 and more same symbols with "<count><symbol>".
+	`text` must not contain digits.
+	"""
+	return "".join(
+		symbol if count == 1 else f"{count}{symbol}"
+		for symbol, count in ((symbol, len(tuple(run))) for symbol, run in itertools.groupby(text))
+	)
+
+
+def rleDecode(text: str) -> str:
+	"""Inverse of `rleEncode`."""
+	return "".join(
+		symbol * (int(count) if count else 1)
+		for count, symbol in _RUN_PATTERN.findall(text)
+	)
+
+
+def _getMaskSize(totalCells: int) -> int:
+	return (totalCells + 7) // 8
+
+
+def packMask(indices: Iterable[int], totalCells: int) -> bytes:
+	"""Pack cell `indices` to bitmask of `totalCells` bits."""
+	mask = 0
+	for i in indices:
+		mask |= 1 << i
+	return mask.to_bytes(_getMaskSize(totalCells), "little")
+
+
+def unpackMask(buffer: Buffer) -> list[int]:
+	"""Inverse of `packMask`: get indices of set bits in ascending order."""
+	mask = int.from_bytes(buffer, "little")
+	indices = []
+	while mask:
+		lowestBit = mask & -mask
+		indices.append(lowestBit.bit_length() - 1)
+		mask ^= lowestBit
+	return indices
+
+
+def packField(
+	n: int,
+	m: int,
+	runnerPos: int,
+	walls: Iterable[int],
+	goals: Iterable[int],
+	boxes: Iterable[int]
+) -> bytes:
+	"""Pack field with `n` columns and `m` rows (all positions are cell
+	indices).
+	"""
+	totalCells = n * m
+	return b"".join((
+		FIELD_HEADER.pack(n, m, runnerPos),
+		packMask(walls, totalCells),
+		packMask(goals, totalCells),
+		packMask(boxes, totalCells),
+	))
+
+
+def getFieldSize(buffer: Buffer, offset: int = 0) -> int:
+	"""Get size of packed field that starts at `offset` of `buffer`."""
+	n, m, _ = FIELD_HEADER.unpack_from(buffer, offset)
+	return FIELD_HEADER.size + 3 * _getMaskSize(n * m)
+
+
+def unpackField(
+	buffer: Buffer,
+	offset: int = 0
+) -> tuple[int, int, int, list[int], list[int], list[int]]:
+	"""Inverse of `packField`: get n, m, runner position, WALLs, GOALs and
+	boxes of packed field that starts at `offset` of `buffer`.
+	"""
+	view = memoryview(buffer)
+	n, m, runnerPos = FIELD_HEADER.unpack_from(view, offset)
+	maskSize = _getMaskSize(n * m)
+	start = offset + FIELD_HEADER.size
+	walls, goals, boxes = (
+		unpackMask(view[start + k * maskSize:start + (k + 1) * maskSize])
+		for k in range(3)
+	)
+	return n, m, runnerPos, walls, goals, boxes
+
+
+def getDirsSize(totalDirs: int) -> int:
+	"""Get size of `totalDirs` packed directions."""
+	return (totalDirs + 3) // 4
+
+
+def packDirs(dirs: Iterable[MoveDir]) -> bytes:
+	"""Pack move directions, 2 bits each."""
+	packed = bytearray()
+	for k, moveDir in enumerate(dirs):
+		if k % 4 == 0:
+			packed.append(0)
+		packed[-1] |= _DIR_CODES[moveDir] << (k % 4 * 2)
+	return bytes(packed)
+
+
+def unpackDirs(buffer: Buffer, totalDirs: int, offset: int = 0) -> tuple[MoveDir, ...]:
+	"""Inverse of `packDirs`: get `totalDirs` directions packed at `offset`
+	of `buffer`.
+	"""
+	view = memoryview(buffer)[offset:offset + getDirsSize(totalDirs)]
+	return tuple(itertools.chain.from_iterable(_BYTE_DIRS[byte] for byte in view))[:totalDirs]
+